@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 import csv
+import functools
 import os
 import shutil
-from typing import List
-import html as htmllib
+from typing import Dict, List, Optional
 import re
 
 
@@ -14,88 +14,15 @@ OUT_MD = "docs/名簿_公開版.md"
 OUT_HTML = "docs/index.html"
 DOCS_ASSETS_DIR = "docs/assets/icons"
 OFFICIAL_URL = "https://kochi-vibecording-camp.netlify.app/"
+WRITE_BUFFER_SIZE = 1024 * 1024
 
+_TRUTHY = frozenset({"true", "1", "yes", "y", "公開", "ok"})
+_IG_RE = re.compile(r"instagram\.com/([^/?#]+)")
+# Same replacements as html.escape(s, quote=True), applied in a single C-level pass
+_ESC = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
 
-def truthy(s: str) -> bool:
-    if s is None:
-        return False
-    v = s.strip().lower()
-    return v in {"true", "1", "yes", "y", "公開", "ok"}
-
-
-def write_csv(rows: List[dict], fieldnames: List[str]):
-    os.makedirs(OUT_DIR, exist_ok=True)
-    with open(OUT_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(r)
-
-
-def write_md(rows: List[dict], fieldnames: List[str]):
-    # Exclude the publish flag from Markdown output
-    md_fields = [fn for fn in fieldnames if fn != "公開可否"]
-    with open(OUT_MD, "w", encoding="utf-8") as f:
-        f.write("# バイブコーディングキャンプ 参加者名簿\n\n")
-        f.write("（注）Discordで自己紹介いただいた方のみ表示しています。\n\n")
-        f.write(f"公式サイト: {OFFICIAL_URL}\n\n")
-        # Header
-        f.write("| " + " | ".join(md_fields) + " |\n")
-        f.write("|" + "|".join(["---"] * len(md_fields)) + "|\n")
-        for r in rows:
-            vals = [str(r.get(k, "") or "").replace("\n", " ") for k in md_fields]
-            f.write("| " + " | ".join(vals) + " |\n")
-
-
-def ensure_docs_icons(icon_path: str) -> str:
-    """Copy local icon into docs/assets/icons and return the path for HTML src.
-    If icon_path is remote (http/https), return it as-is. Appends a cache-busting
-    query string based on file mtime to avoid stale images on Pages.
-    """
-    if icon_path.startswith("http://") or icon_path.startswith("https://"):
-        return icon_path
-    if not icon_path:
-        return ""
-    os.makedirs(DOCS_ASSETS_DIR, exist_ok=True)
-    basename = os.path.basename(icon_path)
-    dst = os.path.join(DOCS_ASSETS_DIR, basename)
-    try:
-        shutil.copy2(icon_path, dst)
-        mtime = int(os.path.getmtime(dst))
-    except FileNotFoundError:
-        return ""
-    # Return path relative to docs root with cache buster
-    return f"assets/icons/{basename}?v={mtime}"
 
-
-def write_html(rows: List[dict]):
-    def extract_x_handle(x_url: str) -> str:
-        if not x_url:
-            return ""
-        x_url = x_url.strip()
-        if x_url.startswith("@"):  # raw handle
-            return x_url[1:]
-        if x_url.startswith("http"):
-            try:
-                from urllib.parse import urlsplit
-
-                parts = urlsplit(x_url)
-                path = parts.path or ""
-                handle = path.strip("/").split("/")[0]
-                handle = handle.split("?")[0]
-                return handle
-            except Exception:
-                return ""
-        return x_url
-
-    def extract_instagram_handle_from_links(links: str) -> str:
-        if not links:
-            return ""
-        m = re.search(r"instagram\.com/([^/?#]+)", links)
-        return m.group(1) if m else ""
-
-    with open(OUT_HTML, "w", encoding="utf-8") as f:
-        f.write("""<!DOCTYPE html>
+_HTML_HEAD = """<!DOCTYPE html>
 <html lang="ja">
 <head>
   <meta charset="UTF-8" />
@@ -150,116 +77,295 @@ def write_html(rows: List[dict]):
     <div class="cta"><a class="btn" target="_blank" rel="noopener" href="https://kochi-vibecording-camp.netlify.app/">公式サイトへ</a></div>
   </header>
   <div class="container">
-""")
-        if not rows:
-            f.write("<p style='color:#9ca3af;text-align:center'>公開可否を true に設定するとカードが表示されます。</p>")
-        # Sort: non-bottom first, people with icons first, keep original order otherwise
-        bottom_names = {"イケハヤ", "むなかた総理", "RYUTA"}
-        def has_icon_row(r: dict) -> bool:
-            icon_spec = (r.get("アイコンURL") or "").strip()
-            xh = extract_x_handle(r.get("XアカウントURL") or "")
-            ig = extract_instagram_handle_from_links(r.get("SNSリンク") or "")
-            return bool(icon_spec or xh or ig)
-        indexed = list(enumerate(rows))
-        indexed.sort(key=lambda it: (
-            1 if (it[1].get("ハンドルネーム") or "") in bottom_names else 0,
-            0 if has_icon_row(it[1]) else 1,
-            it[0],
-        ))
+"""
+
+_HTML_EMPTY = "<p style='color:#9ca3af;text-align:center'>公開可否を true に設定するとカードが表示されます。</p>"
+
+_HTML_FOOT = """</div>
+</div>
+<footer>Generated by export_public.py</footer>
+</body></html>"""
+
+CARD_TEMPLATE = (
+    "  <div class=card>\n"
+    "    <div class=row>\n"
+    "{avatar_block}"
+    "      <div>\n"
+    "        <div class=name>{name}</div>\n"
+    "{feat_block}"
+    "      </div>\n"
+    "    </div>\n"
+    "{desc_block}{meta_block}{links_block}"
+    "  </div>\n"
+)
+
+
+def esc(s: str) -> str:
+    return s.translate(_ESC) if s else ""
+
+
+def col(r: tuple, i: Optional[int]) -> str:
+    """Value of column index i in row r, or "" when the column is absent."""
+    return r[i] if i is not None else ""
+
+
+def truthy(s: str) -> bool:
+    return s is not None and s.strip().lower() in _TRUTHY
+
+
+def write_csv(rows: List[tuple], fieldnames: List[str]):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    with open(OUT_CSV, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
 
-        f.write("<div class=grid>\n")
-        for _, r in indexed:
-            # Prefer explicit icon URL; else try local icons derived from X/Instagram handles
-            icon_src = ensure_docs_icons((r.get("アイコンURL") or "").strip())
-            # Use priority: local -> unavatar -> live X（安定優先）
-            x_handle = extract_x_handle(r.get("XアカウントURL") or "")
-            ig_handle = extract_instagram_handle_from_links(r.get("SNSリンク") or "")
-            if not icon_src:
-                if x_handle:
-                    icon_src = ensure_docs_icons(f"assets/icons/{x_handle}.jpg")
-            if not icon_src and ig_handle:
-                icon_src = ensure_docs_icons(f"assets/icons/{ig_handle}.jpg")
-            x_live = f"https://x.com/{x_handle}/profile_image?size=original" if x_handle else ""
-            unavatar = f"https://unavatar.io/x/{x_handle}" if x_handle else (f"https://unavatar.io/instagram/{ig_handle}" if ig_handle else "")
-            name = htmllib.escape(r.get("ハンドルネーム") or "")
-            feat = htmllib.escape(r.get("特徴（ひとことで）") or "")
-            loc = htmllib.escape(r.get("お住まい") or "")
-            job = htmllib.escape(r.get("お仕事") or "")
-            x_url = (r.get("XアカウントURL") or "").strip()
-            sns = (r.get("SNSリンク") or "").split(",")
-            sns = [s.strip() for s in sns if s.strip()]
-            desc = htmllib.escape(r.get("リアル人物の特徴説明") or r.get("ひとこと") or "")
-            f.write("  <div class=card>\n")
-            f.write("    <div class=row>\n")
-            # Build fallback chain
-            sources = [s for s in [icon_src, unavatar, x_live] if s]
-            if sources:
-                src0 = sources[0]
-                src1 = sources[1] if len(sources) > 1 else ""
-                src2 = sources[2] if len(sources) > 2 else ""
-                onerr_parts = []
-                if src1:
-                    onerr_parts.append(f"if(!this.dataset.step){{this.dataset.step='1';this.src='{src1}';return;}}")
-                if src2:
-                    onerr_parts.append(f"if(this.dataset.step==='1'){{this.dataset.step='2';this.src='{src2}';return;}}")
-                onerr_parts.append("this.onerror=null")
-                onerr = " ".join(onerr_parts)
-                click_url = x_url or (sns[0] if sns else "")
-                if click_url:
-                    click_esc = htmllib.escape(click_url)
-                    f.write(f"      <a class=avatar-link target=_blank rel=noopener href=\"{click_esc}\">\n")
-                f.write(
-                    f"      <img class=avatar src=\"{src0}\" alt=\"{name}\" loading=\"lazy\" decoding=\"async\" referrerpolicy=\"no-referrer\" onerror=\"{onerr}\" />\n"
+
+def md_cell(v: str) -> str:
+    # Most cells have no newline, so skip the replace scan for them
+    return v.replace("\n", " ") if "\n" in v else v
+
+
+def write_md(rows: List[tuple], fieldnames: List[str]):
+    # Exclude the publish flag from Markdown output
+    md_fields = [fn for fn in fieldnames if fn != "公開可否"]
+    md_idx = [i for i, fn in enumerate(fieldnames) if fn != "公開可否"]
+    with open(OUT_MD, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write("# バイブコーディングキャンプ 参加者名簿\n\n")
+        f.write("（注）Discordで自己紹介いただいた方のみ表示しています。\n\n")
+        f.write(f"公式サイト: {OFFICIAL_URL}\n\n")
+        # Header
+        f.write("| " + " | ".join(md_fields) + " |\n")
+        f.write("|" + "|".join(["---"] * len(md_fields)) + "|\n")
+        for r in rows:
+            f.write("| " + " | ".join(md_cell(r[i]) for i in md_idx) + " |\n")
+
+
+def link_or_copy(src: str, dst: str):
+    """Hardlink src to dst, falling back to a copy (e.g. across filesystems)."""
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+@functools.lru_cache(maxsize=None)
+def ensure_docs_icons(icon_path: str) -> str:
+    """Copy local icon into docs/assets/icons and return the path for HTML src.
+    If icon_path is remote (http/https), return it as-is. Appends a cache-busting
+    query string based on file mtime to avoid stale images on Pages.
+    The copy is skipped only when the docs icon is already the same file, or
+    has the source's exact mtime and size. Results are cached per path for the
+    lifetime of the process.
+    """
+    if icon_path.startswith("http://") or icon_path.startswith("https://"):
+        return icon_path
+    if not icon_path:
+        return ""
+    try:
+        st_src = os.stat(icon_path)
+    except FileNotFoundError:
+        return ""
+    basename = os.path.basename(icon_path)
+    dst = os.path.join(DOCS_ASSETS_DIR, basename)
+    try:
+        st_dst = os.stat(dst)
+    except FileNotFoundError:
+        st_dst = None
+    # Links and copies keep the source mtime, so the docs icon is current only
+    # if it is the same file or matches mtime and size exactly. A newer dst is
+    # not enough: git checkout writes docs/ after assets/ and images/.
+    up_to_date = st_dst is not None and (
+        os.path.samestat(st_src, st_dst)
+        or (st_dst.st_mtime_ns == st_src.st_mtime_ns and st_dst.st_size == st_src.st_size)
+    )
+    if not up_to_date:
+        link_or_copy(icon_path, dst)
+    mtime = st_src.st_mtime_ns // 1_000_000_000
+    # Return path relative to docs root with cache buster
+    return f"assets/icons/{basename}?v={mtime}"
+
+
+@functools.lru_cache(maxsize=512)
+def extract_x_handle(x_url: str) -> str:
+    if not x_url:
+        return ""
+    x_url = x_url.strip()
+    if x_url.startswith("@"):  # raw handle
+        return x_url[1:]
+    if x_url.startswith("http"):
+        # Same split as urlsplit, by plain slicing: an optional "scheme:", then
+        # an optional "//host" ending at the first "/", "?" or "#"
+        rest = x_url
+        scheme, colon, after = x_url.partition(":")
+        if colon and scheme.isascii() and all(c.isalnum() or c in "+-." for c in scheme):
+            rest = after
+        if rest.startswith("//"):
+            end = len(rest)
+            for sep in "/?#":
+                i = rest.find(sep, 2, end)
+                if i != -1:
+                    end = i
+            rest = rest[end:]
+        path = rest.split("?", 1)[0].split("#", 1)[0]
+        return path.strip("/").split("/")[0]
+    return x_url
+
+
+@functools.lru_cache(maxsize=512)
+def extract_instagram_handle_from_links(links: str) -> str:
+    if not links or "instagram.com/" not in links:
+        return ""
+    m = _IG_RE.search(links)
+    return m.group(1) if m else ""
+
+
+def write_html(rows: List[tuple], idx: Dict[str, int]):
+    # Created once here so ensure_docs_icons never has to
+    os.makedirs(DOCS_ASSETS_DIR, exist_ok=True)
+    idx_icon = idx.get("アイコンURL")
+    idx_name = idx.get("ハンドルネーム")
+    idx_feat = idx.get("特徴（ひとことで）")
+    idx_desc = idx.get("リアル人物の特徴説明")
+    idx_x = idx.get("XアカウントURL")
+    idx_sns = idx.get("SNSリンク")
+    idx_loc = idx.get("お住まい")
+    idx_job = idx.get("お仕事")
+    idx_comment = idx.get("ひとこと")
+
+    parts: List[str] = []
+    append = parts.append
+    append(_HTML_HEAD)
+    if not rows:
+        append(_HTML_EMPTY)
+    # Sort: non-bottom first, people with icons first, keep original order otherwise
+    bottom_names = {"イケハヤ", "むなかた総理", "RYUTA"}
+    def has_icon_row(r: tuple) -> bool:
+        icon_spec = col(r, idx_icon).strip()
+        xh = extract_x_handle(col(r, idx_x))
+        ig = extract_instagram_handle_from_links(col(r, idx_sns))
+        return bool(icon_spec or xh or ig)
+    # Decorate each row with its sort key once; the unique index means
+    # comparisons never fall through to the row itself
+    decorated = [
+        (
+            (
+                1 if col(r, idx_name) in bottom_names else 0,
+                0 if has_icon_row(r) else 1,
+                i,
+            ),
+            r,
+        )
+        for i, r in enumerate(rows)
+    ]
+    decorated.sort()
+
+    append("<div class=grid>\n")
+    for _, r in decorated:
+        # Prefer explicit icon URL; else try local icons derived from X/Instagram handles
+        x_url = col(r, idx_x).strip()
+        sns_links = col(r, idx_sns)
+        icon_src = ensure_docs_icons(col(r, idx_icon).strip())
+        # Use priority: local -> unavatar -> live X（安定優先）
+        x_handle = extract_x_handle(x_url)
+        ig_handle = extract_instagram_handle_from_links(sns_links)
+        if not icon_src:
+            if x_handle:
+                icon_src = ensure_docs_icons(f"assets/icons/{x_handle}.jpg")
+        if not icon_src and ig_handle:
+            icon_src = ensure_docs_icons(f"assets/icons/{ig_handle}.jpg")
+        x_live = f"https://x.com/{x_handle}/profile_image?size=original" if x_handle else ""
+        unavatar = f"https://unavatar.io/x/{x_handle}" if x_handle else (f"https://unavatar.io/instagram/{ig_handle}" if ig_handle else "")
+        name = esc(col(r, idx_name))
+        feat = esc(col(r, idx_feat))
+        loc = esc(col(r, idx_loc))
+        job = esc(col(r, idx_job))
+        sns = sns_links.split(",")
+        sns = [s.strip() for s in sns if s.strip()]
+        desc = esc(col(r, idx_desc) or col(r, idx_comment))
+        # Build fallback chain
+        avatar_block = ""
+        sources = [s for s in [icon_src, unavatar, x_live] if s]
+        if sources:
+            src0 = sources[0]
+            src1 = sources[1] if len(sources) > 1 else ""
+            src2 = sources[2] if len(sources) > 2 else ""
+            onerr_parts = []
+            if src1:
+                onerr_parts.append(f"if(!this.dataset.step){{this.dataset.step='1';this.src='{src1}';return;}}")
+            if src2:
+                onerr_parts.append(f"if(this.dataset.step==='1'){{this.dataset.step='2';this.src='{src2}';return;}}")
+            onerr_parts.append("this.onerror=null")
+            onerr = " ".join(onerr_parts)
+            avatar_block = (
+                f"      <img class=avatar src=\"{src0}\" alt=\"{name}\" loading=\"lazy\" decoding=\"async\" referrerpolicy=\"no-referrer\" onerror=\"{onerr}\" />\n"
+            )
+            click_url = x_url or (sns[0] if sns else "")
+            if click_url:
+                click_esc = esc(click_url)
+                avatar_block = (
+                    f"      <a class=avatar-link target=_blank rel=noopener href=\"{click_esc}\">\n"
+                    f"{avatar_block}"
+                    "      </a>\n"
                 )
-                if click_url:
-                    f.write("      </a>\n")
-            f.write("      <div>\n")
-            f.write(f"        <div class=name>{name}</div>\n")
-            if feat:
-                f.write(f"        <div class=feature>{feat}</div>\n")
-            f.write("      </div>\n")
-            f.write("    </div>\n")
-            if desc:
-                f.write(f"    <div class=desc>{desc}</div>\n")
-            if loc or job:
-                meta = " ・ ".join([t for t in [loc, job] if t])
-                f.write(f"    <div class=meta>{meta}</div>\n")
-            links_out = []
-            if x_url:
-                links_out.append(("X", x_url, ""))
-            for s in sns:
-                label = s.split("//")[-1]
-                extra = " link-miri" if "miricanvas.com" in s else ""
-                if "miricanvas.com" in s:
-                    label = "おすすめAIツールMiriCanvas"
-                links_out.append((label, s, extra))
-            if links_out:
-                f.write("    <div class=links>\n")
-                for label, url, extra_cls in links_out[:4]:
-                    url_esc = htmllib.escape(url)
-                    label_esc = htmllib.escape(label[:28])
-                    f.write(f"      <a class=link{extra_cls} target=_blank rel=noopener href=\"{url_esc}\">{label_esc}</a>\n")
-                f.write("    </div>\n")
-            f.write("  </div>\n")
-        f.write("</div>\n</div>\n")
-        f.write("<footer>Generated by export_public.py</footer>\n")
-        f.write("</body></html>")
+        feat_block = f"        <div class=feature>{feat}</div>\n" if feat else ""
+        desc_block = f"    <div class=desc>{desc}</div>\n" if desc else ""
+        meta_block = ""
+        if loc or job:
+            meta = " ・ ".join([t for t in [loc, job] if t])
+            meta_block = f"    <div class=meta>{meta}</div>\n"
+        links_out = []
+        if x_url:
+            links_out.append(("X", x_url, ""))
+        for s in sns:
+            label = s.split("//")[-1]
+            extra = " link-miri" if "miricanvas.com" in s else ""
+            if "miricanvas.com" in s:
+                label = "おすすめAIツールMiriCanvas"
+            links_out.append((label, s, extra))
+        links_block = ""
+        if links_out:
+            links_block = "    <div class=links>\n" + "".join(
+                f"      <a class=link{extra_cls} target=_blank rel=noopener href=\"{esc(url)}\">{esc(label[:28])}</a>\n"
+                for label, url, extra_cls in links_out[:4]
+            ) + "    </div>\n"
+        append(CARD_TEMPLATE.format(
+            avatar_block=avatar_block,
+            name=name,
+            feat_block=feat_block,
+            desc_block=desc_block,
+            meta_block=meta_block,
+            links_block=links_block,
+        ))
+    append(_HTML_FOOT)
+
+    with open(OUT_HTML, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write("".join(parts))
 
 
 def main():
     if not os.path.exists(IN_CSV):
         raise SystemExit(f"not found: {IN_CSV}")
     with open(IN_CSV, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        all_rows = list(reader)
-        fieldnames = reader.fieldnames or []
-    if "公開可否" not in fieldnames:
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        n = len(fieldnames)
+        # Skip blank lines and pad/trim each row to the header width so columns
+        # can be indexed positionally downstream
+        all_rows = [tuple(row[:n]) + ("",) * (n - len(row)) for row in reader if row]
+    idx = {name: i for i, name in enumerate(fieldnames)}
+    if "公開可否" not in idx:
         raise SystemExit("CSVに '公開可否' 列がありません")
 
-    pub_rows = [r for r in all_rows if truthy(r.get("公開可否", ""))]
+    idx_pub = idx["公開可否"]
+    pub_rows = [r for r in all_rows if truthy(r[idx_pub])]
     write_csv(pub_rows, fieldnames)
     write_md(pub_rows, fieldnames)
-    write_html(pub_rows)
+    write_html(pub_rows, idx)
     print(f"exported: {len(pub_rows)} rows -> {OUT_CSV}, {OUT_MD}, {OUT_HTML}")
 
 
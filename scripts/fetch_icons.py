@@ -3,12 +3,33 @@ import csv
 import os
 import re
 import sys
-from urllib.parse import urlsplit
-from urllib.request import Request, urlopen
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, getproxies, proxy_bypass, urlopen
 
 
 CSV_PATH = "data/participants_template.csv"
 OUT_DIR = "assets/icons"
+MAX_WORKERS = 16
+HEADERS = {"User-Agent": "Mozilla/5.0 (Codex CLI)"}
+TIMEOUT = 20
+MAX_REDIRECTS = 5
+
+_IG_RE = re.compile(r"instagram\.com/([^/?#]+)")
+_YT_RE = re.compile(r"youtube\.com/@([A-Za-z0-9_\-\.]+)")
+_CLEAN_RE = re.compile(r"[^A-Za-z0-9_]+")
+
+# Keep-alive connections, one per (scheme, host) per worker thread, so each
+# host costs a single TCP/TLS handshake per thread instead of one per URL
+_local = threading.local()
+# Rows sharing a handle share one download: out_path -> result, guarded per path
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+_path_results = {}
+# http.client does not speak proxies; proxied URLs go through urlopen instead
+_PROXIES = getproxies()
 
 
 def extract_handle(x_url: str) -> str:
@@ -32,74 +53,196 @@ def extract_handle(x_url: str) -> str:
         except Exception:
             return ""
     # fallback: return as-is if it's a likely handle
-    return re.sub(r"[^A-Za-z0-9_]+", "", x_url)
+    return _CLEAN_RE.sub("", x_url)
+
+
+def _connection(scheme: str, host: str) -> HTTPConnection:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get((scheme, host))
+    if conn is None:
+        cls = HTTPSConnection if scheme == "https" else HTTPConnection
+        conn = conns[(scheme, host)] = cls(host, timeout=TIMEOUT)
+    return conn
+
+
+def _urlopen_get(url: str):
+    req = Request(url, headers=HEADERS)
+    with urlopen(req, timeout=TIMEOUT) as resp:
+        return resp.status, resp.headers.get("Content-Type", ""), resp.read()
+
+
+def _request(conn: HTTPConnection, path: str):
+    reused = conn.sock is not None
+    try:
+        conn.request("GET", path, headers=HEADERS)
+        return conn.getresponse()
+    except (ConnectionResetError, BrokenPipeError):
+        # RemoteDisconnected is a ConnectionResetError. An idle keep-alive
+        # socket the server already dropped gets one retry on a fresh one
+        conn.close()
+        if not reused:
+            raise
+    except Exception:
+        conn.close()
+        raise
+    try:
+        conn.request("GET", path, headers=HEADERS)
+        return conn.getresponse()
+    except Exception:
+        conn.close()
+        raise
+
+
+def http_get(url: str):
+    """GET url over a pooled connection, following redirects.
+    Falls back to urlopen when a proxy applies to the URL.
+    Returns (status, content_type, body).
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if _PROXIES.get(parts.scheme) and not proxy_bypass(parts.hostname or ""):
+            return _urlopen_get(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        conn = _connection(parts.scheme, parts.netloc)
+        resp = _request(conn, path)
+        # Always drain the body so the connection can be reused
+        data = resp.read()
+        location = resp.getheader("Location")
+        if resp.status in (301, 302, 303, 307, 308) and location:
+            url = urljoin(url, location)
+            continue
+        return resp.status, resp.getheader("Content-Type", ""), data
+    return 0, "", b""
 
 
 def download_first(candidates, out_path: str) -> bool:
     """Try a list of URLs and save the first that returns image/* content."""
-    headers = {"User-Agent": "Mozilla/5.0 (Codex CLI)"}
     for url in candidates:
         try:
-            req = Request(url, headers=headers)
-            with urlopen(req, timeout=20) as resp:
-                ctype = resp.headers.get("Content-Type", "")
-                data = resp.read()
-                if not data or not ctype.startswith("image/"):
-                    continue
-                os.makedirs(os.path.dirname(out_path), exist_ok=True)
-                with open(out_path, "wb") as f:
-                    f.write(data)
-                return True
+            status, ctype, data = http_get(url)
+            if not 200 <= status < 300 or not data or not ctype.startswith("image/"):
+                continue
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, "wb") as f:
+                f.write(data)
+            return True
         except Exception:
             continue
     return False
 
 
-def fetch_x_icon(handle: str, out_path: str) -> bool:
+def x_candidates(handle: str) -> list:
     # Try unavatar variants first, then twitter redirect endpoint
-    candidates = [
+    return [
         f"https://unavatar.io/x/{handle}",
         f"https://unavatar.io/twitter/{handle}",
         f"https://unavatar.io/https://twitter.com/{handle}",
         f"https://twitter.com/{handle}/profile_image?size=original",
     ]
-    return download_first(candidates, out_path)
 
 
 def extract_youtube_handle(url: str) -> str:
-    if not url:
+    if not url or "youtube.com/@" not in url:
         return ""
-    m = re.search(r"youtube\.com/@([A-Za-z0-9_\-\.]+)", url)
+    m = _YT_RE.search(url)
     if m:
         return m.group(1)
     return ""
 
 
-def fetch_youtube_icon(handle: str, out_path: str) -> bool:
+def youtube_candidates(handle: str) -> list:
     # Try multiple unavatar variants
-    candidates = [
+    return [
         f"https://unavatar.io/youtube/{handle}",
         f"https://unavatar.io/youtube/@{handle}",
         f"https://unavatar.io/https://www.youtube.com/@{handle}",
     ]
-    return download_first(candidates, out_path)
 
 
 def extract_instagram_handle(url: str) -> str:
-    if not url:
+    if not url or "instagram.com/" not in url:
         return ""
-    m = re.search(r"instagram\.com/([^/?#]+)", url)
+    m = _IG_RE.search(url)
     if m:
         return m.group(1)
     return ""
 
 
-def fetch_instagram_icon(handle: str, out_path: str) -> bool:
-    candidates = [
+def instagram_candidates(handle: str) -> list:
+    return [
         f"https://unavatar.io/instagram/{handle}",
         f"https://unavatar.io/https://instagram.com/{handle}",
     ]
-    return download_first(candidates, out_path)
+
+
+def plan(row: dict, force: bool = False) -> list:
+    """Decide which icon downloads a CSV row needs.
+
+    Returns a list of (label, out_path, candidates) attempts to try in order
+    until one succeeds: the X handle alone if present, otherwise Instagram
+    then YouTube from SNSリンク. Planning stops at the first attempt whose
+    file already exists (and --force is not given); that attempt has empty
+    candidates, meaning it is already satisfied. An empty list means the row
+    has no usable handle.
+    """
+    # Prefer X handle
+    x_url = (row.get("XアカウントURL") or "").strip()
+    x_handle = extract_handle(x_url)
+    if x_handle:
+        attempts = [(x_handle, x_handle, x_candidates(x_handle))]
+    else:
+        # Try Instagram (from SNSリンク) if X is missing; then YouTube
+        sns_links = (row.get("SNSリンク") or "").strip()
+        attempts = []
+        ig_handle = extract_instagram_handle(sns_links)
+        if ig_handle:
+            attempts.append((f"instagram:{ig_handle}", ig_handle, instagram_candidates(ig_handle)))
+        yt_handle = extract_youtube_handle(sns_links)
+        if yt_handle:
+            attempts.append((f"youtube:{yt_handle}", yt_handle, youtube_candidates(yt_handle)))
+
+    planned = []
+    for label, handle, candidates in attempts:
+        out_path = os.path.join(OUT_DIR, f"{handle}.jpg")
+        if os.path.exists(out_path) and not force:
+            # Already on disk: higher-priority attempts above still get tried
+            planned.append((label, out_path, []))
+            break
+        planned.append((label, out_path, candidates))
+    return planned
+
+
+def fetch_once(candidates, out_path: str) -> str:
+    """Download out_path at most once per run, even when several rows (and so
+    several worker threads) ask for it. Returns "fetched" for the row that
+    downloaded it, "exists" for later rows once it succeeded, else "failed".
+    """
+    with _path_locks_guard:
+        lock = _path_locks.setdefault(out_path, threading.Lock())
+    with lock:
+        if out_path in _path_results:
+            return "exists" if _path_results[out_path] else "failed"
+        fetched = download_first(candidates, out_path)
+        _path_results[out_path] = fetched
+        return "fetched" if fetched else "failed"
+
+
+def fetch_planned(attempts: list) -> list:
+    """Run planned attempts in order until one succeeds.
+    Returns (label, out_path, status) for each attempt tried, where status is
+    "fetched", "exists" or "failed".
+    """
+    results = []
+    for label, out_path, candidates in attempts:
+        status = fetch_once(candidates, out_path) if candidates else "exists"
+        results.append((label, out_path, status))
+        if status != "failed":
+            break
+    return results
 
 
 def main():
@@ -116,58 +259,28 @@ def main():
         sys.exit(1)
 
     ok, ng = 0, 0
+    pending = []
     with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Prefer X handle
-            x_url = (row.get("XアカウントURL") or "").strip()
-            x_handle = extract_handle(x_url)
-            out_path = None
-            fetched = False
-
-            if x_handle:
-                out_path = os.path.join(OUT_DIR, f"{x_handle}.jpg")
-                if os.path.exists(out_path) and not force:
+        for row in csv.DictReader(f):
+            attempts = plan(row, force)
+            if not attempts:
+                ng += 1
+            elif not attempts[0][2]:
+                ok += 1
+            else:
+                pending.append(attempts)
+
+    # Downloads are network-bound, so overlap them across a thread pool
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        for results in ex.map(fetch_planned, pending):
+            for label, out_path, status in results:
+                if status == "exists":
                     ok += 1
-                    continue
-                fetched = fetch_x_icon(x_handle, out_path)
-                if fetched:
+                elif status == "fetched":
                     ok += 1
-                    print(f"fetched: {x_handle} -> {out_path}")
+                    print(f"fetched: {label} -> {out_path}")
                 else:
-                    print(f"failed: {x_handle}", file=sys.stderr)
-            else:
-                # Try Instagram (from SNSリンク) if X is missing; then YouTube
-                sns_links = (row.get("SNSリンク") or "").strip()
-                ig_handle = extract_instagram_handle(sns_links)
-                if ig_handle:
-                    out_path = os.path.join(OUT_DIR, f"{ig_handle}.jpg")
-                    if os.path.exists(out_path) and not force:
-                        ok += 1
-                    else:
-                        fetched = fetch_instagram_icon(ig_handle, out_path)
-                        if fetched:
-                            ok += 1
-                            print(f"fetched: instagram:{ig_handle} -> {out_path}")
-                        else:
-                            print(f"failed: instagram:{ig_handle}", file=sys.stderr)
-
-                if not fetched:
-                    yt_handle = extract_youtube_handle(sns_links)
-                    if yt_handle:
-                        out_path = os.path.join(OUT_DIR, f"{yt_handle}.jpg")
-                        if os.path.exists(out_path) and not force:
-                            ok += 1
-                        else:
-                            fetched = fetch_youtube_icon(yt_handle, out_path)
-                            if fetched:
-                                ok += 1
-                                print(f"fetched: youtube:{yt_handle} -> {out_path}")
-                            else:
-                                print(f"failed: youtube:{yt_handle}", file=sys.stderr)
-            if not fetched and not out_path:
-                ng += 1
-                continue
+                    print(f"failed: {label}", file=sys.stderr)
 
     print(f"done. success={ok}, failed={ng}")
 